@@ -1,10 +1,118 @@
 """Functions for working with STIX 2.0 granular markings.
 """
 
+import collections
+
 from stix2 import exceptions
 from stix2.markings import utils
 from stix2.utils import new_version
 
+# Objects with at most this many granular markings are matched directly
+# instead of through a selector index.
+_INDEX_THRESHOLD = 16
+
+
+def _build_selector_index(granular_markings):
+    """Index the selectors of ``granular_markings`` for prefix lookups.
+
+    Selectors are dotted paths (e.g. ``external_references.[0].url``), so they
+    are stored both by exact value and in a trie keyed by their ``.``
+    separated components. Each trie node is a ``(refs, children)`` pair.
+
+    Args:
+        granular_markings: The granular markings list property present in a
+            SDO or SRO.
+
+    Returns:
+        tuple: A dict mapping each selector to its marking identifiers and the
+            root node of the selector trie.
+
+    """
+    explicit = collections.defaultdict(list)
+    root = ([], {})
+
+    for marking in granular_markings:
+        marking_ref = marking.get("marking_ref")
+
+        for selector in marking.get("selectors") or ():
+            explicit[selector].append(marking_ref)
+
+            node = root
+            for component in selector.split("."):
+                node = node[1].setdefault(component, ([], {}))
+            node[0].append(marking_ref)
+
+    return explicit, root
+
+
+def _match_selector(index, user_selector, inherited, descendants):
+    """Yield the marking identifiers that apply to ``user_selector``.
+
+    Identifiers may be yielded more than once.
+    """
+    explicit, root = index
+
+    if not inherited and not descendants:
+        for ref in explicit.get(user_selector, ()):
+            yield ref
+        return
+
+    # Walk down to the user selector, collecting markings on its ancestors.
+    node = root
+    for component in user_selector.split("."):
+        node = node[1].get(component)
+
+        if node is None:
+            return
+
+        if inherited:
+            for ref in node[0]:
+                yield ref
+
+    if not inherited:
+        for ref in node[0]:
+            yield ref
+
+    if descendants:
+        stack = list(node[1].values())
+        while stack:
+            refs, children = stack.pop()
+            for ref in refs:
+                yield ref
+            stack.extend(children.values())
+
+
+def _match_selectors(granular_markings, selectors, inherited, descendants):
+    """Yield the marking identifiers in ``granular_markings`` that apply to
+    any of ``selectors``.
+
+    Identifiers may be yielded more than once.
+    """
+    if len(granular_markings) <= _INDEX_THRESHOLD:
+        # Building the index costs more than comparing a few selectors.
+        user_selectors = [(s, s + ".") for s in selectors]
+
+        for marking in granular_markings:
+            marking_selectors = marking.get("selectors") or ()
+            marking_ref = marking.get("marking_ref")
+
+            for user_selector, user_prefix in user_selectors:
+                for marking_selector in marking_selectors:
+                    if (user_selector == marking_selector or  # Catch explicit selectors.
+                            (inherited and user_selector.startswith(marking_selector) and
+                             user_selector.startswith(".", len(marking_selector))) or  # Catch inherited selectors.
+                            (descendants and marking_selector.startswith(user_prefix))):  # Catch descendants selectors.
+                        # Other selectors of this marking add the same ref.
+                        yield marking_ref
+                        break
+        return
+
+    index = _build_selector_index(granular_markings)
+
+    for user_selector in selectors:
+        for ref in _match_selector(index, user_selector, inherited, descendants):
+            yield ref
+
 
 def get_markings(obj, selectors, inherited=False, descendants=False):
     """
@@ -26,7 +134,7 @@ def get_markings(obj, selectors, inherited=False, descendants=False):
         list: Marking identifiers that matched the selectors expression.
 
     """
-    selectors = utils.convert_to_list(selectors)
+    selectors = utils.convert_to_selector_list(selectors)
     utils.validate(obj, selectors)
 
     granular_markings = obj.get("granular_markings", [])
@@ -34,18 +142,7 @@ def get_markings(obj, selectors, inherited=False, descendants=False):
     if not granular_markings:
         return []
 
-    results = set()
-
-    for marking in granular_markings:
-        for user_selector in selectors:
-            for marking_selector in marking.get("selectors", []):
-                if any([(user_selector == marking_selector),  # Catch explicit selectors.
-                        (user_selector.startswith(marking_selector) and inherited),  # Catch inherited selectors.
-                        (marking_selector.startswith(user_selector) and descendants)]):  # Catch descendants selectors
-                    refs = marking.get("marking_ref", [])
-                    results.update([refs])
-
-    return list(results)
+    return list(set(_match_selectors(granular_markings, selectors, inherited, descendants)))
 
 
 def set_markings(obj, marking, selectors):
@@ -60,13 +157,28 @@ def set_markings(obj, marking, selectors):
         marking: identifier or list of marking identifiers that apply to the
             properties selected by `selectors`.
 
+    Raises:
+        InvalidSelectorError: If `selectors` fail validation.
+        MarkingNotFoundError: If the SDO or SRO has granular markings but none
+            of them apply to `selectors`.
+
     Returns:
         A new version of the given SDO or SRO with specified markings removed
         and new ones added.
 
     """
-    obj = clear_markings(obj, selectors)
-    return add_markings(obj, marking, selectors)
+    selectors = utils.convert_to_selector_list(selectors)
+    marking = utils.convert_to_marking_list(marking)
+    utils.validate(obj, selectors)
+
+    granular_markings = _get_expanded(obj)
+
+    if granular_markings:
+        granular_markings = _clear_markings(obj, granular_markings, selectors)
+
+    granular_markings = _add_markings(granular_markings, marking, selectors)
+    granular_markings = utils.compress_markings(granular_markings)
+    return new_version(obj, granular_markings=granular_markings, _shallow=True)
 
 
 def remove_markings(obj, marking, selectors):
@@ -89,7 +201,7 @@ def remove_markings(obj, marking, selectors):
         A new version of the given SDO or SRO with specified markings removed.
 
     """
-    selectors = utils.convert_to_list(selectors)
+    selectors = utils.convert_to_selector_list(selectors)
     marking = utils.convert_to_marking_list(marking)
     utils.validate(obj, selectors)
 
@@ -98,27 +210,11 @@ def remove_markings(obj, marking, selectors):
     if not granular_markings:
         return obj
 
-    granular_markings = utils.expand_markings(granular_markings)
-
-    to_remove = []
-    for m in marking:
-        to_remove.append({"marking_ref": m, "selectors": selectors})
-
-    remove = utils.build_granular_marking(to_remove).get("granular_markings")
-
-    if not any(marking in granular_markings for marking in remove):
-        raise exceptions.MarkingNotFoundError(obj, remove)
-
-    granular_markings = [
-        m for m in granular_markings if m not in remove
-    ]
-
+    granular_markings = _get_expanded(obj)
+    granular_markings = _remove_markings(obj, granular_markings, marking, selectors)
     granular_markings = utils.compress_markings(granular_markings)
 
-    if granular_markings:
-        return new_version(obj, granular_markings=granular_markings)
-    else:
-        return new_version(obj, granular_markings=None)
+    return new_version(obj, granular_markings=granular_markings or None, _shallow=True)
 
 
 def add_markings(obj, marking, selectors):
@@ -139,20 +235,13 @@ def add_markings(obj, marking, selectors):
         A new version of the given SDO or SRO with specified markings added.
 
     """
-    selectors = utils.convert_to_list(selectors)
+    selectors = utils.convert_to_selector_list(selectors)
     marking = utils.convert_to_marking_list(marking)
     utils.validate(obj, selectors)
 
-    granular_marking = []
-    for m in marking:
-        granular_marking.append({"marking_ref": m, "selectors": sorted(selectors)})
-
-    if obj.get("granular_markings"):
-        granular_marking.extend(obj.get("granular_markings"))
-
-    granular_marking = utils.expand_markings(granular_marking)
+    granular_marking = _add_markings(_get_expanded(obj), marking, selectors)
     granular_marking = utils.compress_markings(granular_marking)
-    return new_version(obj, granular_markings=granular_marking)
+    return new_version(obj, granular_markings=granular_marking, _shallow=True)
 
 
 def clear_markings(obj, selectors):
@@ -173,7 +262,7 @@ def clear_markings(obj, selectors):
         A new version of the given SDO or SRO with specified markings cleared.
 
     """
-    selectors = utils.convert_to_list(selectors)
+    selectors = utils.convert_to_selector_list(selectors)
     utils.validate(obj, selectors)
 
     granular_markings = obj.get("granular_markings")
@@ -181,35 +270,167 @@ def clear_markings(obj, selectors):
     if not granular_markings:
         return obj
 
-    granular_markings = utils.expand_markings(granular_markings)
+    granular_markings = _get_expanded(obj)
+    granular_markings = _clear_markings(obj, granular_markings, selectors)
+    granular_markings = utils.compress_markings(granular_markings)
 
-    sdo = utils.build_granular_marking(
-        [{"selectors": selectors, "marking_ref": "N/A"}]
-    )
+    return new_version(obj, granular_markings=granular_markings or None, _shallow=True)
 
-    clear = sdo.get("granular_markings", [])
 
-    if not any(clear_selector in sdo_selectors.get("selectors", [])
-               for sdo_selectors in granular_markings
-               for clear_marking in clear
-               for clear_selector in clear_marking.get("selectors", [])
-               ):
-        raise exceptions.MarkingNotFoundError(obj, clear)
+def _is_expanded(granular_markings):
+    """Return True if every granular marking has exactly one selector."""
+    return all(len(m.get("selectors") or ()) == 1 for m in granular_markings)
 
-    for granular_marking in granular_markings:
-        for s in selectors:
-            if s in granular_marking.get("selectors", []):
-                marking_refs = granular_marking.get("marking_ref")
 
-                if marking_refs:
-                    granular_marking["marking_ref"] = ""
+def _get_expanded(obj):
+    """Return the granular markings of ``obj`` in expanded form.
 
-    granular_markings = utils.compress_markings(granular_markings)
+    The helpers below never modify the markings they are given, so markings
+    that are already expanded are reused as they are.
+    """
+    granular_markings = obj.get("granular_markings") or []
+
+    if _is_expanded(granular_markings):
+        return list(granular_markings)
+
+    return utils.expand_markings(granular_markings)
+
+
+def _remove_markings(obj, granular_markings, marking, selectors):
+    """Remove ``marking`` from the expanded ``granular_markings`` list."""
+    # Expanded markings hold a single selector, so compare them by key.
+    remove_keys = set((m, (s,)) for m in marking for s in selectors)
+    keys = [(m.get("marking_ref"), tuple(m.get("selectors") or ())) for m in granular_markings]
+
+    if remove_keys.isdisjoint(keys):
+        remove = [{"marking_ref": m, "selectors": [s]} for m in marking for s in selectors]
+        raise exceptions.MarkingNotFoundError(obj, remove)
+
+    return [
+        m for m, key in zip(granular_markings, keys) if key not in remove_keys
+    ]
+
+
+def _add_markings(granular_markings, marking, selectors):
+    """Add ``marking`` to the expanded ``granular_markings`` list."""
+    sorted_selectors = sorted(selectors)
+    granular_marking = [
+        {"marking_ref": m, "selectors": [s]}
+        for m in marking for s in sorted_selectors
+    ]
+
+    granular_marking.extend(granular_markings)
+    return granular_marking
 
-    if granular_markings:
-        return new_version(obj, granular_markings=granular_markings)
-    else:
-        return new_version(obj, granular_markings=None)
+
+def _clear_markings(obj, granular_markings, selectors):
+    """Clear the markings on ``selectors`` from the expanded
+    ``granular_markings`` list."""
+    existing = set().union(*(m.get("selectors") or () for m in granular_markings))
+
+    if existing.isdisjoint(selectors):
+        sdo = utils.build_granular_marking(
+            [{"selectors": selectors, "marking_ref": "N/A"}]
+        )
+        raise exceptions.MarkingNotFoundError(obj, sdo.get("granular_markings", []))
+
+    selectors_set = frozenset(selectors)
+
+    return [
+        m for m in granular_markings
+        if selectors_set.isdisjoint(m.get("selectors") or ())
+    ]
+
+
+class _MarkingsBatch(object):
+    """Accumulates granular marking edits on an expanded markings list.
+
+    Returned by :func:`batch_markings`. The resulting object is available as
+    ``result`` once the ``with`` block exits.
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.result = None
+        self._granular_markings = None
+        self._changed = False
+
+    def _expanded(self):
+        if self._granular_markings is None:
+            self._granular_markings = _get_expanded(self.obj)
+        return self._granular_markings
+
+    def add(self, marking, selectors):
+        """Add markings. Refer to :func:`add_markings` for details."""
+        selectors = utils.convert_to_selector_list(selectors)
+        marking = utils.convert_to_marking_list(marking)
+        utils.validate(self.obj, selectors)
+
+        self._granular_markings = _add_markings(self._expanded(), marking, selectors)
+        self._changed = True
+
+    def remove(self, marking, selectors):
+        """Remove markings. Refer to :func:`remove_markings` for details."""
+        selectors = utils.convert_to_selector_list(selectors)
+        marking = utils.convert_to_marking_list(marking)
+        utils.validate(self.obj, selectors)
+
+        # Like remove_markings, leave an object without markings unchanged.
+        if self._expanded():
+            self._granular_markings = _remove_markings(self.obj, self._granular_markings, marking, selectors)
+            self._changed = True
+
+    def clear(self, selectors):
+        """Clear markings. Refer to :func:`clear_markings` for details."""
+        selectors = utils.convert_to_selector_list(selectors)
+        utils.validate(self.obj, selectors)
+
+        # Like clear_markings, leave an object without markings unchanged.
+        if self._expanded():
+            self._granular_markings = _clear_markings(self.obj, self._granular_markings, selectors)
+            self._changed = True
+
+    def set(self, marking, selectors):
+        """Set markings. Refer to :func:`set_markings` for details."""
+        self.clear(selectors)
+        self.add(marking, selectors)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None or not self._changed:
+            self.result = self.obj
+            return
+
+        granular_markings = utils.compress_markings(self._granular_markings)
+        self.result = new_version(self.obj, granular_markings=granular_markings or None, _shallow=True)
+
+
+def batch_markings(obj):
+    """
+    Apply several granular marking edits to an object at once.
+
+    The markings of ``obj`` are expanded once, every edit made through the
+    returned builder operates on that expanded list, and a single new version
+    is created when the ``with`` block exits.
+
+    Example:
+        >>> with batch_markings(obj) as builder:
+        ...     builder.add(MARKING_IDS[0], "description")
+        ...     builder.remove(MARKING_IDS[1], "name")
+        >>> new_obj = builder.result
+
+    Args:
+        obj: An SDO or SRO object.
+
+    Returns:
+        A context manager whose ``add``, ``remove``, ``clear`` and ``set``
+        methods mirror the module level functions. If the block raises, or no
+        edits are made, ``result`` is the original object.
+
+    """
+    return _MarkingsBatch(obj)
 
 
 def is_marked(obj, marking=None, selectors=None, inherited=False, descendants=False):
@@ -241,31 +462,27 @@ def is_marked(obj, marking=None, selectors=None, inherited=False, descendants=Fa
     if selectors is None:
         raise TypeError("Required argument 'selectors' must be provided")
 
-    selectors = utils.convert_to_list(selectors)
+    selectors = utils.convert_to_selector_list(selectors)
     marking = utils.convert_to_marking_list(marking)
     utils.validate(obj, selectors)
 
     granular_markings = obj.get("granular_markings", [])
 
-    marked = False
-    markings = set()
-
-    for granular_marking in granular_markings:
-        for user_selector in selectors:
-            for marking_selector in granular_marking.get("selectors", []):
+    if not granular_markings:
+        return False
 
-                if any([(user_selector == marking_selector),  # Catch explicit selectors.
-                        (user_selector.startswith(marking_selector) and inherited),  # Catch inherited selectors.
-                        (marking_selector.startswith(user_selector) and descendants)]):  # Catch descendants selectors
-                    marking_ref = granular_marking.get("marking_ref", "")
+    # All user-provided markings must be found.
+    required = frozenset(marking or ())
+    markings = set()
 
-                    if marking and any(x == marking_ref for x in marking):
-                        markings.update([marking_ref])
+    for marking_ref in _match_selectors(granular_markings, selectors, inherited, descendants):
+        if not required:
+            return True
 
-                    marked = True
+        if marking_ref in required:
+            markings.add(marking_ref)
 
-    if marking:
-        # All user-provided markings must be found.
-        return markings.issuperset(set(marking))
+            if markings >= required:
+                return True
 
-    return marked
+    return False
@@ -4,41 +4,11 @@
 import collections
 
 import six
+from six.moves import intern
 
 from stix2 import exceptions
 
 
-def _evaluate_expression(obj, selector):
-    """Walks an SDO or SRO generating selectors to match against ``selector``.
-
-    If a match is found and the the value of this property is present in the
-    objects. Matching value of the property will be returned.
-
-    Args:
-        obj: An SDO or SRO object.
-        selector (str): A string following the selector syntax.
-
-    Returns:
-        list: Values contained in matching property. Otherwise empty list.
-
-    """
-    for items, value in iterpath(obj):
-        path = ".".join(items)
-
-        if path == selector and value:
-            return [value]
-
-    return []
-
-
-def _validate_selector(obj, selector):
-    """Internal method to evaluate each selector."""
-    results = list(_evaluate_expression(obj, selector))
-
-    if len(results) >= 1:
-        return True
-
-
 def _get_marking_id(marking):
     if type(marking).__name__ is 'MarkingDefinition':  # avoid circular import
         return marking.id
@@ -46,10 +16,26 @@ def _get_marking_id(marking):
 
 
 def validate(obj, selectors):
-    """Given an SDO or SRO, check that each selector is valid."""
+    """Given an SDO or SRO, check that each selector is valid.
+
+    A selector is valid if it names a property of ``obj`` with a non-empty
+    value. The object is walked once for all selectors, stopping as soon as
+    every selector has been found.
+    """
     if selectors:
+        # Selectors that are not strings can never name a property.
+        pending = set(s for s in selectors if isinstance(s, six.string_types))
+
+        if pending:
+            for items, value in iterpath(obj):
+                if value:
+                    pending.discard(".".join(items))
+
+                    if not pending:
+                        break
+
         for s in selectors:
-            if not _validate_selector(obj, s):
+            if not isinstance(s, six.string_types) or s in pending:
                 raise exceptions.InvalidSelectorError(obj, s)
         return
 
@@ -65,6 +51,17 @@ def convert_to_list(data):
             return [data]
 
 
+def convert_to_selector_list(data):
+    """Convert input into a list of interned selector strings.
+
+    Interning lets selectors that are compared repeatedly, e.g. the ones
+    written back to an object by ``add_markings``, match by identity.
+    """
+    data = convert_to_list(data)
+    if data is not None:
+        return [intern(s) if isinstance(s, str) else s for s in data]
+
+
 def convert_to_marking_list(data):
     """Convert input into a list of marking identifiers."""
     if data is not None:
@@ -228,8 +225,8 @@ def iterpath(obj, path=None):
 
         elif isinstance(varobj, list):
 
-            for item in varobj:
-                index = "[{0}]".format(varobj.index(item))
+            for i, item in enumerate(varobj):
+                index = "[{0}]".format(i)
                 path.append(index)
 
                 yield (path, item)
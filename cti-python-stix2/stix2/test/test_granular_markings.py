@@ -2,6 +2,8 @@
 import pytest
 
 from stix2 import TLP_RED, Malware, markings
+from stix2.exceptions import InvalidSelectorError, MarkingNotFoundError
+from stix2.utils import new_version
 
 from .constants import MALWARE_MORE_KWARGS as MALWARE_KWARGS_CONST
 from .constants import MARKING_IDS
@@ -361,6 +363,52 @@ def test_get_markings_positional_arguments_combinations(data):
     assert set(markings.get_markings(data, "x.z.foo2", False, True)) == set(["10"])
 
 
+@pytest.mark.parametrize("data", [GET_MARKINGS_TEST_DATA])
+def test_get_markings_positional_arguments_combinations_indexed(data, monkeypatch):
+    """Test the selector index gives the same results as direct matching."""
+    monkeypatch.setattr(markings.granular_markings, "_INDEX_THRESHOLD", 0)
+    test_get_markings_positional_arguments_combinations(data)
+
+
+def test_get_markings_repeated_list_values():
+    """Test list items with equal values get their own selectors."""
+    data = {
+        "c": ["value", "value"],
+        "granular_markings": [
+            {
+                "marking_ref": "1",
+                "selectors": ["c.[1]"]
+            },
+        ]
+    }
+
+    assert markings.get_markings(data, "c.[1]") == ["1"]
+    assert markings.get_markings(data, "c.[0]") == []
+
+
+@pytest.mark.parametrize("threshold", [0, 16])
+def test_get_markings_sibling_selector_prefix(threshold, monkeypatch):
+    """Test selectors sharing a string prefix are not treated as ancestors."""
+    monkeypatch.setattr(markings.granular_markings, "_INDEX_THRESHOLD", threshold)
+    data = {
+        "a": 1,
+        "ab": 2,
+        "granular_markings": [
+            {
+                "marking_ref": "1",
+                "selectors": ["a"]
+            },
+            {
+                "marking_ref": "2",
+                "selectors": ["ab"]
+            },
+        ]
+    }
+
+    assert set(markings.get_markings(data, "ab", True, False)) == set(["2"])
+    assert set(markings.get_markings(data, "a", False, True)) == set(["1"])
+
+
 @pytest.mark.parametrize("data", [
     (
         Malware(
@@ -1044,3 +1092,103 @@ def test_clear_marking_bad_selector(data, selector):
     """Test bad selector raises exception."""
     with pytest.raises(AssertionError):
         markings.clear_markings(data, selector)
+
+
+@pytest.mark.parametrize("data,selector", [
+    (CLEAR_MARKINGS_TEST_DATA[0], [["description"]]),
+    (CLEAR_MARKINGS_TEST_DATA[1], [{"description": 1}]),
+    (CLEAR_MARKINGS_TEST_DATA[1], ["description", ["type"]]),
+])
+def test_clear_marking_unhashable_selector(data, selector):
+    """Test selectors that are not strings raise InvalidSelectorError."""
+    with pytest.raises(InvalidSelectorError):
+        markings.clear_markings(data, selector)
+
+
+def test_is_marked_positional_arguments_combinations_indexed(monkeypatch):
+    """Test the selector index gives the same results as direct matching."""
+    monkeypatch.setattr(markings.granular_markings, "_INDEX_THRESHOLD", 0)
+    test_is_marked_positional_arguments_combinations()
+
+
+def test_remove_marking_entry_without_ref():
+    before = {
+        "a": 1,
+        "granular_markings": [
+            {
+                "selectors": ["a"]
+            },
+            {
+                "marking_ref": "2",
+                "selectors": ["a"]
+            },
+        ]
+    }
+
+    after = markings.remove_markings(before, "2", "a")
+    assert markings.get_markings(after, "a") == []
+
+
+def test_batch_markings_single_new_version(monkeypatch):
+    before = Malware(
+        granular_markings=[
+            {
+                "selectors": ["description", "name"],
+                "marking_ref": MARKING_IDS[1]
+            }
+        ],
+        **MALWARE_KWARGS
+    )
+
+    versions = []
+
+    def counting_new_version(data, **kwargs):
+        versions.append(data)
+        return new_version(data, **kwargs)
+
+    monkeypatch.setattr(markings.granular_markings, "new_version", counting_new_version)
+
+    with markings.granular_markings.batch_markings(before) as builder:
+        builder.add(MARKING_IDS[0], "description")
+        builder.add([MARKING_IDS[2], MARKING_IDS[3]], ["name"])
+        builder.remove(MARKING_IDS[1], "description")
+        builder.clear("name")
+        builder.add(MARKING_IDS[4], "name")
+
+    after = builder.result
+    assert versions == [before]
+    assert set(markings.get_markings(after, "description")) == set([MARKING_IDS[0]])
+    assert set(markings.get_markings(after, "name")) == set([MARKING_IDS[4]])
+
+
+def test_batch_markings_no_edits():
+    before = Malware(
+        **MALWARE_KWARGS
+    )
+
+    with markings.granular_markings.batch_markings(before) as builder:
+        pass
+
+    assert builder.result is before
+
+
+def test_batch_markings_unmarked_object():
+    before = Malware(
+        **MALWARE_KWARGS
+    )
+
+    with markings.granular_markings.batch_markings(before) as builder:
+        builder.clear("description")
+        builder.remove(MARKING_IDS[0], "description")
+
+    assert builder.result is before
+
+
+@pytest.mark.parametrize("data", CLEAR_MARKINGS_TEST_DATA)
+def test_batch_markings_clear_twice(data):
+    with pytest.raises(MarkingNotFoundError):
+        with markings.granular_markings.batch_markings(data) as builder:
+            builder.clear("type")
+            builder.clear("type")
+
+    assert builder.result is data
@@ -56,6 +56,50 @@ def test_making_new_version_with_embedded_object():
     assert campaign_v1.external_references[0].external_id != campaign_v2.external_references[0].external_id
 
 
+def test_making_new_version_shallow():
+    campaign_v1 = stix2.Campaign(
+        external_references=[{
+            "source_name": "capec",
+            "external_id": "CAPEC-163"
+        }],
+        **CAMPAIGN_MORE_KWARGS
+    )
+
+    campaign_v2 = stix2.new_version(campaign_v1, name="fred", _shallow=True)
+
+    assert campaign_v1.id == campaign_v2.id
+    assert campaign_v2.name == "fred"
+    assert campaign_v1.description == campaign_v2.description
+    assert campaign_v1.external_references == campaign_v2.external_references
+    assert campaign_v1.modified < campaign_v2.modified
+    assert "_shallow" not in campaign_v2
+
+
+def test_making_new_version_shallow_copies_containers():
+    observed_data_v1 = stix2.ObservedData(
+        first_observed="2015-12-21T19:00:00Z",
+        last_observed="2015-12-21T19:00:00Z",
+        number_observed=50,
+        objects={
+            "0": {
+                "name": "foo.exe",
+                "type": "file"
+            },
+        },
+    )
+
+    # Immutable observables are shared, the dict holding them is copied.
+    inner = stix2.utils._copy_containers(observed_data_v1._inner)
+    assert inner["objects"]["0"] is observed_data_v1._inner["objects"]["0"]
+    assert inner["objects"] is not observed_data_v1._inner["objects"]
+
+    observed_data_v2 = stix2.new_version(observed_data_v1, number_observed=2, _shallow=True)
+    assert observed_data_v2.objects is not observed_data_v1.objects
+
+    observed_data_v2.objects["1"] = observed_data_v2.objects["0"]
+    assert "1" not in observed_data_v1.objects
+
+
 def test_revoke():
     campaign_v1 = stix2.Campaign(**CAMPAIGN_MORE_KWARGS)
 
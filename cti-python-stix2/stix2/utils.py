@@ -196,10 +196,26 @@ def find_property_index(obj, properties, tuple_to_find):
                             return val
 
 
+def _copy_containers(value):
+    """Copy the dicts and lists in ``value``, sharing any other values."""
+    if isinstance(value, dict):
+        return {k: _copy_containers(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_copy_containers(v) for v in value]
+    return value
+
+
 def new_version(data, **kwargs):
     """Create a new version of a STIX object, by modifying properties and
     updating the ``modified`` property.
+
+    Passing ``_shallow=True`` makes a new version of an SDO or SRO instance
+    copy only the dicts and lists among its property values; other values,
+    such as nested STIX objects, are immutable and are shared with ``data``
+    instead of being deep copied. Dictionaries passed as ``data`` are always
+    deep copied.
     """
+    shallow = kwargs.pop('_shallow', False)
 
     if not isinstance(data, Mapping):
         raise ValueError('cannot create new version of object of this type! '
@@ -209,7 +225,10 @@ def new_version(data, **kwargs):
     if data.get("revoked"):
         raise RevokeError("new_version")
     try:
-        new_obj_inner = copy.deepcopy(data._inner)
+        if shallow:
+            new_obj_inner = _copy_containers(data._inner)
+        else:
+            new_obj_inner = copy.deepcopy(data._inner)
     except AttributeError:
         new_obj_inner = copy.deepcopy(data)
     properties_to_change = kwargs.keys()